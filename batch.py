@@ -0,0 +1,64 @@
+# batch.py
+"""
+Runs pre-recorded audio through STT -> intent routing/LLM -> TTS in bulk.
+
+    python batch.py --input-dir recordings/ --output-dir batch_out --concurrency 8
+    python batch.py --manifest calls.jsonl --output-dir batch_out --executor process
+
+Results and per-item timings go to <output-dir>/results.jsonl, the reply
+audio to <output-dir>/<id>.mp3 and a summary to summary.json. Re-running
+with the same output directory resumes from checkpoint.txt unless
+--no-resume is given.
+"""
+import argparse
+import json
+import logging
+import re
+
+from schemas import VOICE_ID_PATTERN
+from services import batch
+
+
+def voice_id(value: str) -> str:
+    if not re.fullmatch(VOICE_ID_PATTERN, value):
+        raise argparse.ArgumentTypeError(f"'{value}' is not a Murf voice id like en-US-natalie")
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input-dir", help="Directory scanned recursively for audio files")
+    source.add_argument("--manifest", help="JSON lines ({\"id\", \"path\"}) or one path per line")
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+    parser.add_argument("--no-resume", action="store_true", help="Ignore and overwrite an existing checkpoint")
+    parser.add_argument("--voice-id", type=voice_id, default="en-US-natalie")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    items = batch.discover_items(input_dir=args.input_dir, manifest=args.manifest)
+    completed = 0
+
+    def on_progress(result):
+        nonlocal completed
+        completed += 1
+        status = f"error: {result['error']}" if result["error"] else f"{result['timings_ms']['total']:.0f} ms"
+        logging.info(f"[{completed}] {result['id']} - {status}")
+
+    summary = batch.run_batch(
+        items,
+        output_dir=args.output_dir,
+        concurrency=args.concurrency,
+        executor=args.executor,
+        resume=not args.no_resume,
+        voice_id=args.voice_id,
+        on_progress=on_progress,
+    )
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# benchmarks/session_memory.py
+"""
+Measures what websocket sessions cost the server: RSS and thread count per
+idle session and per active (audio-streaming) session.
+
+The server runs in a child process with fake STT/LLM/TTS providers from
+services/fakes.py, so no API keys or network access are needed. Upstream
+client threads and sockets of the real AssemblyAI SDK are therefore not
+included in the numbers. Reads /proc, so Linux only.
+
+    python benchmarks/session_memory.py --sessions 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 64 ms of 16 kHz PCM16, the frame size script.js sends
+FRAME = b"\x00" * 2048
+FRAME_INTERVAL = 0.064
+
+
+def serve(port: int, transcript_after_frames: int):
+    """Child process: main.app behind uvicorn with fake providers installed."""
+    os.chdir(ROOT)
+    sys.path.insert(0, str(ROOT))
+    from functools import partial
+    import logging
+    import uvicorn
+    from services import fakes
+
+    logging.disable(logging.WARNING)
+    transcriber = partial(fakes.FakeTranscriber, script=[(transcript_after_frames, 0.0, "Tell me a story, Masha")])
+    with fakes.installed(transcriber, fakes.FakeLLM(), fakes.FakeTTS()):
+        import main
+        uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="error")
+
+
+def read_proc_status(pid: int):
+    status = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            status[key] = value.strip()
+    return int(status["VmRSS"].split()[0]) * 1024, int(status["Threads"])
+
+
+def wait_for_port(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise RuntimeError(f"Server did not start on port {port}")
+
+
+async def open_session(url: str):
+    import websockets
+    ws = await websockets.connect(url, max_size=None)
+    await ws.send(json.dumps({"type": "api_keys"}))
+    return ws
+
+
+async def drain(ws):
+    try:
+        async for _ in ws:
+            pass
+    except Exception:
+        pass
+
+
+async def stream(ws, stop: asyncio.Event):
+    while not stop.is_set():
+        await ws.send(FRAME)
+        await asyncio.sleep(FRAME_INTERVAL)
+
+
+async def run(port: int, pid: int, sessions: int, settle: float):
+    url = f"ws://127.0.0.1:{port}/ws"
+    results = {}
+    base_rss, base_threads = read_proc_status(pid)
+    results["baseline"] = {"rss_mb": round(base_rss / 2 ** 20, 2), "threads": base_threads}
+
+    idle = [await open_session(url) for _ in range(sessions)]
+    drains = [asyncio.create_task(drain(ws)) for ws in idle]
+    await asyncio.sleep(settle)
+    idle_rss, idle_threads = read_proc_status(pid)
+    results["idle"] = {
+        "sessions": sessions,
+        "rss_kb_per_session": round((idle_rss - base_rss) / sessions / 1024, 2),
+        "threads_per_session": round((idle_threads - base_threads) / sessions, 3),
+    }
+
+    active = [await open_session(url) for _ in range(sessions)]
+    drains += [asyncio.create_task(drain(ws)) for ws in active]
+    stop = asyncio.Event()
+    streams = [asyncio.create_task(stream(ws, stop)) for ws in active]
+    await asyncio.sleep(settle)
+    active_rss, active_threads = read_proc_status(pid)
+    results["active"] = {
+        "sessions": sessions,
+        "rss_kb_per_session": round((active_rss - idle_rss) / sessions / 1024, 2),
+        "threads_per_session": round((active_threads - idle_threads) / sessions, 3),
+    }
+
+    stop.set()
+    await asyncio.gather(*streams, return_exceptions=True)
+    await asyncio.gather(*(ws.close() for ws in idle + active), return_exceptions=True)
+    for task in drains:
+        task.cancel()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200, help="Number of idle and of active sessions")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--settle", type=float, default=5.0, help="Seconds to wait before each measurement")
+    parser.add_argument("--transcript-after", type=int, default=30,
+                        help="Frames an active session streams before the fake STT emits a turn")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.transcript_after)
+        return
+
+    server = subprocess.Popen([
+        sys.executable, __file__, "--serve", "--port", str(args.port),
+        "--transcript-after", str(args.transcript_after),
+    ])
+    try:
+        wait_for_port(args.port)
+        results = asyncio.run(run(args.port, server.pid, args.sessions, args.settle))
+    finally:
+        server.terminate()
+        server.wait()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
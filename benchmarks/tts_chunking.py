@@ -0,0 +1,104 @@
+# benchmarks/tts_chunking.py
+"""
+Compares the old regex sentence split with services.chunker on TTS calls
+per reply and time-to-first-audio.
+
+By default Murf latency is simulated as a fixed round trip plus a per
+character synthesis cost. Pass --live to time real tts.speak calls instead
+(needs MURF_API_KEY).
+
+    python benchmarks/tts_chunking.py
+    python benchmarks/tts_chunking.py --min 60 --first-min 20 --first-max 80 --max 180 --rtt-ms 400
+"""
+import argparse
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.chunker import chunk_text  # noqa: E402
+
+SAMPLE_REPLIES = [
+    "Wow! Hi Mishka! Guess what? I found a big shiny rock today. It was SO pretty!",
+    "Ooh, news! Scientists found a new kind of frog in the rainforest, and it is tiny, "
+    "smaller than your fingernail, and it glows a little bit in the dark, and they think "
+    "there might be even more of them hiding under the leaves, so they are going back "
+    "next year to look again with special lamps and cameras!",
+    "Dr. Bear says honey is the best snack. He eats 2.5 jars a day! That is a lot, right? Yes! Haha!",
+    "Okay. Yes. No. Maybe! Let me think. Hmm. I know! We should build a snowman. A huge one!",
+    "The sun is a star, Mishka. It is really, really far away, about 150 million kilometres. "
+    "Light from the sun takes about 8 minutes to get here. Isn't that cool?",
+    "Hello!",
+]
+
+
+def regex_split(text: str):
+    """The split main.py used before the chunker."""
+    return [s.strip() for s in re.split(r'(?<=[.?!])\s+', text.strip()) if s.strip()]
+
+
+def simulated_speak(rtt_ms: float, ms_per_char: float):
+    def speak(text: str) -> float:
+        return (rtt_ms + ms_per_char * len(text)) / 1000.0
+    return speak
+
+
+def live_speak(text: str) -> float:
+    from services import tts
+    start = time.perf_counter()
+    tts.speak(text)
+    return time.perf_counter() - start
+
+
+def measure(split, speak, replies):
+    calls, first_audio, total = [], [], []
+    for reply in replies:
+        chunks = split(reply)
+        durations = [speak(chunk) for chunk in chunks]
+        calls.append(len(chunks))
+        first_audio.append(durations[0] if durations else 0.0)
+        total.append(sum(durations))
+    return {
+        "calls_per_reply": statistics.mean(calls),
+        "max_calls": max(calls),
+        "ttfa_ms_mean": statistics.mean(first_audio) * 1000,
+        "ttfa_ms_max": max(first_audio) * 1000,
+        "synth_ms_mean": statistics.mean(total) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min", type=int, default=40, help="Chunker min_chars")
+    parser.add_argument("--max", type=int, default=220, help="Chunker max_chars")
+    parser.add_argument("--first-min", type=int, default=1, help="Chunker first_min_chars")
+    parser.add_argument("--first-max", type=int, default=100, help="Chunker first_max_chars")
+    parser.add_argument("--rtt-ms", type=float, default=350.0, help="Simulated per-call round trip")
+    parser.add_argument("--ms-per-char", type=float, default=6.0, help="Simulated synthesis cost per character")
+    parser.add_argument("--live", action="store_true", help="Call Murf instead of simulating")
+    args = parser.parse_args()
+
+    speak = live_speak if args.live else simulated_speak(args.rtt_ms, args.ms_per_char)
+    strategies = {
+        "regex": regex_split,
+        f"chunker({args.min},{args.max})": lambda text: chunk_text(text, args.min, args.max),
+        f"chunker({args.min},{args.first_max},{args.max})": lambda text: chunk_text(
+            text, args.min, args.max, first_max_chars=args.first_max
+        ),
+        f"chunker({args.first_min}-{args.first_max},{args.min}-{args.max})": lambda text: chunk_text(
+            text, args.min, args.max, first_max_chars=args.first_max, first_min_chars=args.first_min
+        ),
+    }
+
+    print(f"{'strategy':<28}{'calls/reply':>12}{'max calls':>11}{'ttfa mean':>11}{'ttfa max':>10}{'synth mean':>12}")
+    for name, split in strategies.items():
+        r = measure(split, speak, SAMPLE_REPLIES)
+        print(f"{name:<28}{r['calls_per_reply']:>12.2f}{r['max_calls']:>11}"
+              f"{r['ttfa_ms_mean']:>9.0f}ms{r['ttfa_ms_max']:>8.0f}ms{r['synth_ms_mean']:>10.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
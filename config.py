@@ -49,4 +49,63 @@ set_api_keys()
 
 # Load other non-user-configurable keys from .env
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
-NEWS_API_KEY = os.getenv("NEWS_API_KEY")
\ No newline at end of file
+NEWS_API_KEY = os.getenv("NEWS_API_KEY")
+
+# TTS chunking bounds (characters per Murf call)
+TTS_CHUNK_MIN_CHARS = int(os.getenv("TTS_CHUNK_MIN_CHARS", "40"))
+TTS_CHUNK_MAX_CHARS = int(os.getenv("TTS_CHUNK_MAX_CHARS", "220"))
+# Bounds for the first chunk of a reply. Its first sentence goes out on its own
+# (even "Wow!") and is capped tighter, so audio starts as soon as possible
+TTS_CHUNK_FIRST_MIN_CHARS = int(os.getenv("TTS_CHUNK_FIRST_MIN_CHARS", "1"))
+TTS_CHUNK_FIRST_MAX_CHARS = int(os.getenv("TTS_CHUNK_FIRST_MAX_CHARS", "100"))
+
+# Resilience settings per provider: token-bucket rate (calls/s), burst size,
+# deadline in seconds and the number of calls allowed in flight at once
+TTS_RATE_LIMIT = float(os.getenv("TTS_RATE_LIMIT", "10"))
+TTS_BURST = int(os.getenv("TTS_BURST", "20"))
+TTS_TIMEOUT = float(os.getenv("TTS_TIMEOUT", "10"))
+TTS_MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", "8"))
+LLM_RATE_LIMIT = float(os.getenv("LLM_RATE_LIMIT", "5"))
+LLM_BURST = int(os.getenv("LLM_BURST", "10"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "20"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+NEWS_RATE_LIMIT = float(os.getenv("NEWS_RATE_LIMIT", "1"))
+NEWS_BURST = int(os.getenv("NEWS_BURST", "5"))
+NEWS_TIMEOUT = float(os.getenv("NEWS_TIMEOUT", "5"))
+NEWS_MAX_CONCURRENCY = int(os.getenv("NEWS_MAX_CONCURRENCY", "2"))
+
+# Circuit breakers open after this many consecutive failures and probe again after the reset period
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+
+# Recent TTS chunks kept in memory so repeated lines skip Murf and survive an outage
+TTS_CACHE_SIZE = int(os.getenv("TTS_CACHE_SIZE", "64"))
+
+# Per-connection outbound queue: byte limit, what to do with a slow client
+# ("drop_audio" or "disconnect") and how old queued audio may get before it is dropped
+WS_SEND_QUEUE_MAX_BYTES = int(os.getenv("WS_SEND_QUEUE_MAX_BYTES", str(4 * 1024 * 1024)))
+WS_SLOW_CLIENT_POLICY = os.getenv("WS_SLOW_CLIENT_POLICY", "drop_audio")
+WS_MAX_AUDIO_AGE_SECONDS = float(os.getenv("WS_MAX_AUDIO_AGE_SECONDS", "15"))
+
+# Directory that paths given to the /batch endpoint are resolved against
+BATCH_ROOT = os.getenv("BATCH_ROOT", "batch_data")
+# Batch runs use their own news limiter (same rate as live traffic) and wait
+# up to this many seconds for a token rather than skipping news enrichment
+BATCH_NEWS_TIMEOUT = float(os.getenv("BATCH_NEWS_TIMEOUT", "60"))
+
+# Directory for session captures (inbound audio, transcripts, responses and
+# stage timestamps) used to replay slow sessions; capture is off when unset
+CAPTURE_DIR = os.getenv("CAPTURE_DIR", "")
+
+# Per-session memory: upstream STT connections are released after this many
+# seconds without audio (checked every STT_IDLE_CHECK_SECONDS), and only the
+# most recent HISTORY_MAX_MESSAGES chat messages are kept
+STT_IDLE_SECONDS = float(os.getenv("STT_IDLE_SECONDS", "60"))
+STT_IDLE_CHECK_SECONDS = float(os.getenv("STT_IDLE_CHECK_SECONDS", "10"))
+HISTORY_MAX_MESSAGES = int(os.getenv("HISTORY_MAX_MESSAGES", "20"))
+
+# While the STT connection is being (re)opened, up to this many bytes of audio
+# (5 s of 16 kHz PCM16 by default) are held and sent once it is up. After a
+# failed connect, audio is dropped for STT_RETRY_SECONDS before trying again.
+STT_CONNECT_BUFFER_BYTES = int(os.getenv("STT_CONNECT_BUFFER_BYTES", str(5 * 32000)))
+STT_RETRY_SECONDS = float(os.getenv("STT_RETRY_SECONDS", "5"))
@@ -1,16 +1,25 @@
 # main.py
-from fastapi import FastAPI, Request, WebSocket
-from fastapi.staticfiles import StaticFiles
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Request, WebSocket
+from fastapi.responses import PlainTextResponse
 from fastapi.templating import Jinja2Templates
 import logging
 import asyncio
 import base64
-import re
 import json
+import uuid
+from pathlib import Path
+from typing import Dict
 
 # Import services and config
 import config
-from services import stt, llm, tts
+from schemas import BatchRequest, BatchJobStatus
+from services import llm, tts, batch, capture
+from services.chunker import chunk_text
+from services import metrics
+from services.resilience import llm_provider, tts_provider, tts_cache, ProviderUnavailable
+from services.outbound import OutboundQueue
+from services.session import Session, release_idle_transcribers
+from services.static_assets import StaticAssets
 # Import the roast-related functions
 from services.roast import should_roast_user, format_roast_response
 
@@ -19,15 +28,205 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 
 app = FastAPI()
 
-# Mount static files for CSS/JS
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Static files are hashed and precompressed once, and the page is rendered once,
+# so page loads never compete with voice traffic for worker time
+static_assets = StaticAssets(directory="static")
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["static_url"] = static_assets.url
+static_assets.set_page(templates.get_template("index.html").render())
 
+# Played when TTS is unavailable and the line isn't cached
+FALLBACK_AUDIO = Path("static/fallback.mp3").read_bytes()
+FALLBACK_TEXT = "Oh honey, my brain's a bit fried. What were you saying?"
 
-@app.get("/")
+
+@app.on_event("startup")
+async def start_idle_stt_reaper():
+    """Releases upstream STT connections of sessions that stop sending audio."""
+    # Keep a reference on app.state so the task isn't garbage collected
+    app.state.stt_reaper = asyncio.create_task(
+        release_idle_transcribers(config.STT_IDLE_SECONDS, config.STT_IDLE_CHECK_SECONDS)
+    )
+
+
+@app.api_route("/", methods=["GET", "HEAD"])
 async def home(request: Request):
-    """Serves the main HTML page."""
-    return templates.TemplateResponse("index.html", {"request": request})
+    """Serves the main HTML page, pre-rendered at startup."""
+    return static_assets.respond(static_assets.page, request.headers, immutable=False, head=request.method == "HEAD")
+
+
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"])
+async def static_file(path: str, request: Request):
+    """Serves CSS/JS/images from memory; fingerprinted names are cached as immutable."""
+    asset, immutable = static_assets.lookup(path)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return static_assets.respond(asset, request.headers, immutable=immutable, head=request.method == "HEAD")
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Exposes provider breaker state and other gauges in Prometheus text format."""
+    return PlainTextResponse(metrics.render())
+
+
+# In-memory registry of batch jobs started through the API
+batch_jobs: Dict[str, BatchJobStatus] = {}
+
+
+def resolve_batch_path(relative: str) -> Path:
+    """Resolves a client-supplied path under BATCH_ROOT, refusing anything that escapes it."""
+    root = Path(config.BATCH_ROOT).resolve()
+    path = (root / relative).resolve()
+    if path != root and root not in path.parents:
+        raise ValueError(f"Path '{relative}' is outside the batch root.")
+    return path
+
+
+def run_batch_job(job: BatchJobStatus, items, request: BatchRequest, output_dir: Path):
+    """Runs in Starlette's thread pool so the batch never blocks the event loop."""
+    def on_progress(result):
+        if result["error"]:
+            job.failed += 1
+        else:
+            job.completed += 1
+
+    try:
+        job.summary = batch.run_batch(
+            items,
+            output_dir=str(output_dir),
+            concurrency=request.concurrency,
+            executor=request.executor,
+            resume=request.resume,
+            voice_id=request.voiceId,
+            on_progress=on_progress,
+        )
+        job.skipped = job.summary["skipped"]
+        job.status = "completed"
+    except Exception as e:
+        logging.error(f"Batch job {job.job_id} failed: {e}")
+        job.status = "failed"
+        job.error = str(e)
+
+
+@app.post("/batch", response_model=BatchJobStatus)
+async def start_batch(request: BatchRequest, background_tasks: BackgroundTasks):
+    """Starts a batch run over a directory or manifest of recordings under BATCH_ROOT."""
+    try:
+        output_dir = resolve_batch_path(request.output_dir)
+        items = batch.discover_items(
+            input_dir=str(resolve_batch_path(request.input_dir)) if request.input_dir else None,
+            manifest=str(resolve_batch_path(request.manifest)) if request.manifest else None,
+            root=config.BATCH_ROOT,
+        )
+    except (ValueError, OSError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job = BatchJobStatus(job_id=uuid.uuid4().hex, status="running", total=len(items))
+    batch_jobs[job.job_id] = job
+    background_tasks.add_task(run_batch_job, job, items, request, output_dir)
+    return job
+
+
+@app.get("/batch/{job_id}", response_model=BatchJobStatus)
+async def get_batch(job_id: str):
+    """Reports progress, and the summary once finished, for a batch job."""
+    if job_id not in batch_jobs:
+        raise HTTPException(status_code=404, detail="Unknown batch job")
+    return batch_jobs[job_id]
+
+
+def send_audio(session: Session, turn: int, audio_bytes: bytes, audio_format: str = "wav"):
+    b64_audio = base64.b64encode(audio_bytes).decode('utf-8')
+    session.outbox.send({"type": "audio", "b64": b64_audio, "format": audio_format})
+    session.recorder.stage(turn, "audio_queued")
+
+
+async def speak_chunk(session: Session, turn: int, chunk: str) -> bool:
+    """Sends audio for one chunk. Returns False once TTS is unavailable and fallback audio was sent."""
+    cached = tts_cache.get(chunk)
+    if cached:
+        send_audio(session, turn, cached)
+        return True
+    session.recorder.stage(turn, "tts_start")
+    try:
+        audio_bytes = await tts_provider.call_async(tts.speak, chunk, is_failure=lambda audio: not audio)
+    except ProviderUnavailable as e:
+        logging.warning(f"TTS unavailable, sending fallback audio: {e}")
+        send_audio(session, turn, FALLBACK_AUDIO, "mp3")
+        return False
+    session.recorder.tts(turn, chunk, audio_bytes)
+    if audio_bytes:
+        tts_cache.put(chunk, audio_bytes)
+        send_audio(session, turn, audio_bytes)
+    return True
+
+
+async def handle_transcript(session: Session, text: str):
+    """Processes the final transcript, gets LLM and TTS responses, and streams audio."""
+    outbox, recorder = session.outbox, session.recorder
+    turn = session.next_turn()
+    recorder.stage(turn, "turn_start")
+    outbox.send({"type": "final", "text": text})
+    try:
+        # Check if the user's query is a roast request
+        roast_info = should_roast_user(text)
+
+        if roast_info["is_roast_request"]:
+            # If it's a roast request, get the response from the roast module
+            full_response = format_roast_response(roast_info)
+            # The chat history is not updated for roasts as they are a special, one-off response
+        else:
+            # If not a roast, proceed with the normal LLM logic.
+            # While Gemini's breaker is open this fails fast instead of waiting out a timeout.
+            recorder.stage(turn, "llm_start")
+            try:
+                full_response, updated_history = await llm_provider.call_async(
+                    llm.get_llm_response, text, session.history,
+                    is_failure=lambda result: result[0] == llm.ERROR_RESPONSE
+                )
+            except ProviderUnavailable as e:
+                logging.warning(f"LLM unavailable, sending fallback: {e}")
+                outbox.send({"type": "assistant", "text": FALLBACK_TEXT})
+                send_audio(session, turn, FALLBACK_AUDIO, "mp3")
+                return
+            recorder.llm(turn, full_response)
+            # Update history for the next turn
+            session.set_history(updated_history)
+
+        # Send the full text response to the UI
+        outbox.send({"type": "assistant", "text": full_response})
+
+        # 2. Split the response into TTS-sized chunks
+        chunks = chunk_text(
+            full_response,
+            min_chars=config.TTS_CHUNK_MIN_CHARS,
+            max_chars=config.TTS_CHUNK_MAX_CHARS,
+            first_max_chars=config.TTS_CHUNK_FIRST_MAX_CHARS,
+            first_min_chars=config.TTS_CHUNK_FIRST_MIN_CHARS,
+        )
+
+        # 3. Process each chunk for TTS and stream audio back
+        for chunk in chunks:
+            if outbox.closed:
+                break  # Client went away or was dropped as too slow; stop paying for TTS
+            if chunk.strip() and not await speak_chunk(session, turn, chunk.strip()):
+                break
+
+    except Exception as e:
+        logging.error(f"Error in LLM/TTS pipeline: {e}")
+        # The error message should also be in character now
+        outbox.send({"type": "llm", "text": FALLBACK_TEXT})
+        send_audio(session, turn, FALLBACK_AUDIO, "mp3")
+    finally:
+        recorder.stage(turn, "turn_end")
+
+
+def on_final_transcript(session: Session, text: str):
+    """Called from the STT client's thread; hands the turn over to the session's event loop."""
+    logging.info(f"Final transcript received: {text}")
+    session.recorder.transcript(text)
+    asyncio.run_coroutine_threadsafe(handle_transcript(session, text), session.loop)
 
 
 @app.websocket("/ws")
@@ -36,57 +235,26 @@ async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     logging.info("WebSocket client connected.")
 
-    loop = asyncio.get_event_loop()
-    chat_history = []
-    transcriber = None # Initialize transcriber as None
-
-    async def handle_transcript(text: str):
-        """Processes the final transcript, gets LLM and TTS responses, and streams audio."""
-        await websocket.send_json({"type": "final", "text": text})
-        try:
-            # Check if the user's query is a roast request
-            roast_info = should_roast_user(text)
-
-            if roast_info["is_roast_request"]:
-                # If it's a roast request, get the response from the roast module
-                full_response = format_roast_response(roast_info)
-                # The chat history is not updated for roasts as they are a special, one-off response
-            else:
-                # If not a roast, proceed with the normal LLM logic
-                full_response, updated_history = llm.get_llm_response(text, chat_history)
-                # Update history for the next turn
-                chat_history.clear()
-                chat_history.extend(updated_history)
-
-            # Send the full text response to the UI
-            await websocket.send_json({"type": "assistant", "text": full_response})
-
-            # 2. Split the response into sentences
-            sentences = re.split(r'(?<=[.?!])\s+', full_response.strip())
-
-            # 3. Process each sentence for TTS and stream audio back
-            for sentence in sentences:
-                if sentence.strip():
-                    # Run the blocking TTS function in a separate thread
-                    audio_bytes = await loop.run_in_executor(
-                        None, tts.speak, sentence.strip()
-                    )
-                    if audio_bytes:
-                        b64_audio = base64.b64encode(audio_bytes).decode('utf-8')
-                        await websocket.send_json({"type": "audio", "b64": b64_audio})
-
-        except Exception as e:
-            logging.error(f"Error in LLM/TTS pipeline: {e}")
-            # The error message should also be in character now
-            await websocket.send_json({"type": "llm", "text": "Oh honey, my brain's a bit fried. What were you saying?"})
-
-    def on_final_transcript(text: str):
-        logging.info(f"Final transcript received: {text}")
-        asyncio.run_coroutine_threadsafe(handle_transcript(text), loop)
+    session = Session(
+        websocket,
+        loop=asyncio.get_event_loop(),
+        # All messages to the client go through this queue so a slow link never blocks a turn
+        outbox=OutboundQueue(
+            websocket,
+            max_bytes=config.WS_SEND_QUEUE_MAX_BYTES,
+            policy=config.WS_SLOW_CLIENT_POLICY,
+            max_audio_age=config.WS_MAX_AUDIO_AGE_SECONDS,
+        ),
+        # Opt-in capture of this session for replay (no-op unless CAPTURE_DIR is set)
+        recorder=capture.start_session(),
+        on_final=on_final_transcript,
+    )
 
     try:
         while True:
             data = await websocket.receive()
+            if data["type"] == "websocket.disconnect":
+                break
             if data["type"] == "websocket.receive" and "text" in data:
                 message = json.loads(data["text"])
                 if message.get("type") == "api_keys":
@@ -96,26 +264,20 @@ async def websocket_endpoint(websocket: WebSocket):
                         assemblyai_key=message.get("assemblyai"),
                         murf_key=message.get("murf")
                     )
-                    # Re-initialize transcriber with new key
-                    if transcriber:
-                        transcriber.close()
+                    # (Re-)initialize the transcriber with the new key.
                     # CRITICAL FIX: The transcriber is now created only after the API key is received.
-                    transcriber = stt.AssemblyAIStreamingTranscriber(
-                        api_key=config.ASSEMBLYAI_API_KEY,
-                        on_final_callback=on_final_transcript
-                    )
+                    session.open_transcriber()
                 else:
                     # This case handles a text message that is not an API key update,
                     # which is not expected but good to have.
                     logging.info("Received an unexpected text message.")
 
             else:
-                # Assume it's audio data if transcriber is ready
-                if transcriber:
-                    transcriber.stream_audio(data["bytes"])
+                # Assume it's audio data; dropped until the API keys have arrived
+                session.stream_audio(data["bytes"])
     except Exception as e:
         logging.info(f"WebSocket connection closed: {e}")
     finally:
-        if transcriber:
-            transcriber.close()
-        logging.info("Transcription resources released.")
\ No newline at end of file
+        session.close()
+        await session.outbox.close()
+        logging.info("Transcription resources released.")
@@ -0,0 +1,154 @@
+# replay.py
+"""
+Replays a session capture through main.py against local fake providers and
+reports per-turn latency against the recorded run.
+
+    python replay.py captures/20261019-101500-4242-1.mcap
+    python replay.py captures/20261019-101500-4242-1.mcap --speed 4 --fail-over 20
+
+Inbound audio frames are sent at their recorded offsets divided by --speed.
+The fakes deliver each transcript, LLM reply and TTS clip after its recorded
+latency (also divided by --speed), so the diff isolates time spent in the
+app itself. Replayed latencies are multiplied back by --speed before they
+are compared.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+os.chdir(ROOT)  # main.py resolves static/ and templates/ relative to the working directory
+
+import config  # noqa: E402
+from services import capture, fakes  # noqa: E402
+
+METRICS = ("first_audio", "llm", "tts", "total")
+
+
+def build_fakes(records, speed: float):
+    """Turns a capture's transcripts and provider responses into scripted fakes."""
+    timings = capture.turn_timings(records)
+    script, llm_responses, clips = [], [], {}
+    frames, last_frame_t = 0, 0.0
+    tts_started = {}
+
+    for record in records:
+        if record.kind == capture.AUDIO_IN:
+            frames += 1
+            last_frame_t = record.t
+        elif record.kind == capture.TRANSCRIPT:
+            script.append((frames, max(0.0, record.t - last_frame_t), record.meta["text"]))
+        elif record.kind == capture.LLM_RESPONSE:
+            latency = timings.get(record.meta["turn"], {}).get("llm", 0.0)
+            llm_responses.append((record.meta["text"], latency))
+        elif record.kind == capture.STAGE and record.meta["stage"] == "tts_start":
+            tts_started[record.meta["turn"]] = record.t
+        elif record.kind == capture.TTS_RESPONSE:
+            latency = record.t - tts_started.get(record.meta["turn"], record.t)
+            clips.setdefault(record.meta["text"], []).append((record.data, latency))
+
+    # Replay drives a single session, so one script source spans every reconnect
+    transcriber = fakes.TranscriptScript(script, speed=speed)
+    return transcriber, fakes.FakeLLM(llm_responses, speed=speed), fakes.FakeTTS(clips, speed=speed)
+
+
+def count_turn_ends(path: Path) -> int:
+    return sum(
+        1 for record in capture.read_capture(path)
+        if record.kind == capture.STAGE and record.meta["stage"] == "turn_end"
+    )
+
+
+def replay(records, speed: float, timeout: float) -> Path:
+    """Drives main.app over a websocket with the recorded audio; returns the replay's own capture."""
+    from fastapi.testclient import TestClient
+    import main
+
+    expected_turns = sum(1 for record in records if record.kind == capture.TRANSCRIPT)
+    frames = [record for record in records if record.kind == capture.AUDIO_IN]
+    capture_dir = Path(tempfile.mkdtemp(prefix="masha-replay-"))
+    config.CAPTURE_DIR = str(capture_dir)
+
+    with fakes.installed(*build_fakes(records, speed)), TestClient(main.app) as client:
+        with client.websocket_connect("/ws") as ws:
+            ws.send_json({"type": "api_keys"})
+            start = time.monotonic()
+            t0 = frames[0].t if frames else 0.0
+            for frame in frames:
+                wait = (frame.t - t0) / speed - (time.monotonic() - start)
+                if wait > 0:
+                    time.sleep(wait)
+                ws.send_bytes(frame.data)
+
+            replay_path = next(capture_dir.glob(f"*{capture.CAPTURE_SUFFIX}"))
+            deadline = time.monotonic() + timeout
+            while count_turn_ends(replay_path) < expected_turns and time.monotonic() < deadline:
+                time.sleep(0.05)
+    return replay_path
+
+
+def diff(recorded, replayed, speed: float):
+    """Per-turn comparison in milliseconds, replayed values scaled back to original speed."""
+    rows = []
+    for turn in sorted(recorded):
+        for metric in METRICS:
+            if metric not in recorded[turn]:
+                continue
+            before = recorded[turn][metric] * 1000
+            after = replayed.get(turn, {}).get(metric)
+            after = after * speed * 1000 if after is not None else None
+            rows.append({
+                "turn": turn,
+                "metric": metric,
+                "recorded_ms": round(before, 1),
+                "replayed_ms": round(after, 1) if after is not None else None,
+                "delta_ms": round(after - before, 1) if after is not None else None,
+                "delta_pct": round((after - before) / before * 100, 1) if after is not None and before else None,
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("capture", help="Capture file written with CAPTURE_DIR set")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier (1 = original pace)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for turns after the audio ends")
+    parser.add_argument("--json", action="store_true", help="Print the diff as JSON")
+    parser.add_argument("--fail-over", type=float, default=None,
+                        help="Exit non-zero if any first_audio/total latency regresses by more than this percent")
+    args = parser.parse_args()
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+
+    records = list(capture.read_capture(args.capture))
+    replay_path = replay(records, args.speed, args.timeout)
+    rows = diff(capture.turn_timings(records), capture.turn_timings(list(capture.read_capture(replay_path))), args.speed)
+
+    if args.json:
+        print(json.dumps({"capture": args.capture, "replay": str(replay_path), "speed": args.speed, "turns": rows}, indent=2))
+    else:
+        print(f"Replay capture: {replay_path}")
+        print(f"{'turn':>4}  {'metric':<12}{'recorded':>11}{'replayed':>11}{'delta':>10}{'delta %':>9}")
+        for row in rows:
+            replayed = f"{row['replayed_ms']:.1f}" if row["replayed_ms"] is not None else "missing"
+            delta = f"{row['delta_ms']:+.1f}" if row["delta_ms"] is not None else "-"
+            pct = f"{row['delta_pct']:+.1f}%" if row["delta_pct"] is not None else "-"
+            print(f"{row['turn']:>4}  {row['metric']:<12}{row['recorded_ms']:>11.1f}{replayed:>11}{delta:>10}{pct:>9}")
+
+    if args.fail_over is not None:
+        regressed = [
+            row for row in rows
+            if row["metric"] in ("first_audio", "total")
+            and (row["replayed_ms"] is None or (row["delta_pct"] or 0) > args.fail_over)
+        ]
+        if regressed:
+            print(f"{len(regressed)} latency regression(s) over {args.fail_over}%", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,31 @@
 # schemas.py
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Literal, Optional
+
+# Murf voice ids look like "en-US-natalie"
+VOICE_ID_PATTERN = r"^[a-z]{2}-[A-Z]{2}-[A-Za-z]+$"
 
 class TTSRequest(BaseModel):
     text: str
-    voiceId: str = "en-US-natalie"
\ No newline at end of file
+    voiceId: str = "en-US-natalie"
+
+class BatchRequest(BaseModel):
+    """Starts a batch run over pre-recorded audio. Paths are relative to config.BATCH_ROOT."""
+    input_dir: Optional[str] = None
+    manifest: Optional[str] = None
+    output_dir: str
+    concurrency: int = Field(4, ge=1, le=32)
+    executor: Literal["thread", "process"] = "thread"
+    resume: bool = True
+    voiceId: str = Field("en-US-natalie", pattern=VOICE_ID_PATTERN)
+
+class BatchJobStatus(BaseModel):
+    job_id: str
+    status: str
+    total: int = 0
+    completed: int = 0
+    failed: int = 0
+    skipped: int = 0
+    error: Optional[str] = None
+    summary: Optional[Dict[str, Any]] = None
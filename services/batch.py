@@ -0,0 +1,248 @@
+# services/batch.py
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+import json
+import logging
+import multiprocessing
+import re
+import statistics
+import time
+
+import config
+from . import stt, llm, tts, news
+from .resilience import Provider
+from .roast import should_roast_user, format_roast_response
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".m4a", ".flac", ".ogg", ".webm"}
+RESULTS_FILE = "results.jsonl"
+CHECKPOINT_FILE = "checkpoint.txt"
+SUMMARY_FILE = "summary.json"
+STAGES = ("stt", "llm", "tts", "total")
+
+# Batch runs get their own news limiter and breaker, so load tests neither
+# drain the live news budget nor trip its breaker. Items wait for a token
+# instead of silently losing news enrichment. One per worker process.
+news_provider = Provider(
+    "batch_news",
+    rate=config.NEWS_RATE_LIMIT,
+    burst=config.NEWS_BURST,
+    timeout=config.BATCH_NEWS_TIMEOUT,
+    max_concurrency=config.NEWS_MAX_CONCURRENCY,
+    failure_threshold=config.BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=config.BREAKER_RESET_SECONDS,
+)
+
+
+def discover_items(input_dir: Optional[str] = None, manifest: Optional[str] = None,
+                   root: Optional[str] = None) -> List[Dict[str, str]]:
+    """
+    Lists the local audio files to process as {"id", "path"} dicts.
+
+    A manifest is either JSON lines ({"id": ..., "path": ...}) or one path
+    per line; relative paths are resolved against the manifest's folder.
+    Without a manifest every audio file under input_dir is used, keyed by
+    its path relative to input_dir. If root is given, any item that resolves
+    outside it raises ValueError; the API uses this to confine jobs to BATCH_ROOT.
+    """
+    if manifest:
+        manifest_path = Path(manifest)
+        items = []
+        for line in manifest_path.read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            entry = json.loads(line) if line.startswith("{") else {"path": line}
+            path = Path(entry["path"])
+            if not path.is_absolute():
+                path = manifest_path.parent / path
+            items.append({"id": str(entry.get("id") or entry["path"]), "path": str(path)})
+    elif input_dir:
+        base = Path(input_dir)
+        items = [
+            {"id": str(path.relative_to(base)), "path": str(path)}
+            for path in sorted(base.rglob("*"))
+            if path.is_file() and path.suffix.lower() in AUDIO_EXTENSIONS
+        ]
+    else:
+        raise ValueError("Either input_dir or manifest is required.")
+
+    if root:
+        root_path = Path(root).resolve()
+        for item in items:
+            path = Path(item["path"]).resolve()
+            if path != root_path and root_path not in path.parents:
+                raise ValueError(f"Item '{item['id']}' is outside the batch root.")
+            item["path"] = str(path)
+    return items
+
+
+def route_intent(text: str) -> str:
+    """Mirrors the routing in main.handle_transcript: roast, news-backed LLM or plain LLM."""
+    if should_roast_user(text)["is_roast_request"]:
+        return "roast"
+    if news.should_fetch_news(text):
+        return "news"
+    return "chat"
+
+
+def audio_path(output_dir: Path, item_id: str) -> Path:
+    """Where an item's generated audio is saved; ids may be nested paths, so they are flattened."""
+    return output_dir / (re.sub(r"[^A-Za-z0-9._-]+", "_", item_id).strip("._") + ".mp3")
+
+
+def process_item(item: Dict[str, str], voice_id: str, output_dir: Path) -> Dict[str, Any]:
+    """
+    Runs STT -> intent routing/LLM -> TTS for one file and records per-stage
+    timings in ms. The reply audio is downloaded into output_dir; the TTS
+    timing includes the download.
+    """
+    timings = {}
+    result = {"id": item["id"], "path": item["path"], "timings_ms": timings, "error": None}
+    start = time.perf_counter()
+    try:
+        stage_start = time.perf_counter()
+        transcript = stt.transcribe_file(item["path"])
+        timings["stt"] = (time.perf_counter() - stage_start) * 1000
+        result["transcript"] = transcript
+        if not transcript:
+            raise ValueError("Empty transcript")
+
+        stage_start = time.perf_counter()
+        intent = route_intent(transcript)
+        if intent == "roast":
+            response = format_roast_response(should_roast_user(transcript))
+        else:
+            # Each file is an independent, single-turn conversation
+            response, _ = llm.get_llm_response(transcript, [], news_source=news_provider)
+            if response == llm.ERROR_RESPONSE:
+                raise RuntimeError("LLM request failed")
+        timings["llm"] = (time.perf_counter() - stage_start) * 1000
+        result["intent"] = intent
+        result["response"] = response
+
+        stage_start = time.perf_counter()
+        audio_url = tts.convert_text_to_speech(response, voice_id=voice_id)
+        if not audio_url:
+            raise RuntimeError("Murf returned no audio")
+        result["audio_path"] = str(tts.download_audio(audio_url, audio_path(output_dir, item["id"])))
+        timings["tts"] = (time.perf_counter() - stage_start) * 1000
+    except Exception as e:
+        logger.error(f"Batch item {item['id']} failed: {e}")
+        result["error"] = str(e)
+    timings["total"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def load_checkpoint(output_dir: Path) -> set:
+    """Returns the ids of items that completed successfully in earlier runs."""
+    checkpoint = output_dir / CHECKPOINT_FILE
+    if not checkpoint.exists():
+        return set()
+    return {line for line in checkpoint.read_text(encoding="utf-8").splitlines() if line}
+
+
+def _init_worker(gemini_key, assemblyai_key, murf_key):
+    """Process-pool initializer: keys entered in the UI only live in the parent process."""
+    config.set_api_keys(gemini_key=gemini_key, assemblyai_key=assemblyai_key, murf_key=murf_key)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(results: List[Dict[str, Any]], wall_seconds: float, skipped: int) -> Dict[str, Any]:
+    ok = [r for r in results if not r["error"]]
+    summary = {
+        "processed": len(results),
+        "succeeded": len(ok),
+        "failed": len(results) - len(ok),
+        "skipped": skipped,
+        "wall_seconds": round(wall_seconds, 3),
+        "items_per_second": round(len(results) / wall_seconds, 3) if wall_seconds else 0.0,
+        "stages_ms": {},
+    }
+    for stage in STAGES:
+        values = [r["timings_ms"][stage] for r in ok if stage in r["timings_ms"]]
+        if values:
+            summary["stages_ms"][stage] = {
+                "mean": round(statistics.mean(values), 1),
+                "p50": round(_percentile(values, 50), 1),
+                "p95": round(_percentile(values, 95), 1),
+                "max": round(max(values), 1),
+            }
+    return summary
+
+
+def run_batch(
+        items: List[Dict[str, str]],
+        output_dir: str,
+        concurrency: int = 4,
+        executor: str = "thread",
+        resume: bool = True,
+        voice_id: str = "en-US-natalie",
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Processes items on a thread or process pool and returns a summary.
+
+    Results are appended to results.jsonl as each item finishes, and its id
+    to checkpoint.txt, so an interrupted run can resume where it left off.
+    Each item's reply audio is saved next to them as <id>.mp3.
+    Failed items are not checkpointed and are retried on resume.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    done = load_checkpoint(out) if resume else set()
+    pending = [item for item in items if item["id"] not in done]
+    skipped = len(items) - len(pending)
+    logger.info(f"Batch: {len(pending)} to process, {skipped} already done, concurrency={concurrency} ({executor})")
+
+    if executor == "process":
+        # Never fork: the caller may be the server, with its event loop, provider
+        # pools and AssemblyAI threads running, and a lock held at fork time
+        # would deadlock the child
+        pool = ProcessPoolExecutor(
+            max_workers=concurrency,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(config.GEMINI_API_KEY, config.ASSEMBLYAI_API_KEY, config.MURF_API_KEY),
+        )
+    elif executor == "thread":
+        pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch")
+    else:
+        raise ValueError(f"Unknown executor '{executor}', expected 'thread' or 'process'")
+
+    results = []
+    start = time.perf_counter()
+    mode = "a" if resume else "w"
+    try:
+        with open(out / RESULTS_FILE, mode, encoding="utf-8") as results_file, \
+                open(out / CHECKPOINT_FILE, mode, encoding="utf-8") as checkpoint_file:
+            futures = [pool.submit(process_item, item, voice_id, out) for item in pending]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                results_file.write(json.dumps(result) + "\n")
+                results_file.flush()
+                if not result["error"]:
+                    checkpoint_file.write(result["id"] + "\n")
+                    checkpoint_file.flush()
+                if on_progress:
+                    on_progress(result)
+    except BaseException:
+        # Interrupted: drop queued items; the checkpoint already covers finished ones
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+
+    summary = summarize(results, time.perf_counter() - start, skipped)
+    (out / SUMMARY_FILE).write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    return summary
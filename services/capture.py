@@ -0,0 +1,188 @@
+# services/capture.py
+"""
+Opt-in session capture for performance regression testing.
+
+A capture is an append-only binary file: an 8-byte magic, a format version
+byte and the session's wall-clock start time, followed by records of
+
+    kind (uint8) | seconds since session start (float64) | length (uint32) | payload
+
+Audio records carry the raw PCM frame. Every other record carries a JSON
+header line, optionally followed by binary data (the synthesized audio for
+TTS records). Reading stops cleanly at a truncated tail, so a capture from
+a crashed process is still usable.
+"""
+from pathlib import Path
+from typing import Any, Dict, Iterator, NamedTuple, Optional
+import itertools
+import json
+import logging
+import os
+import struct
+import threading
+import time
+
+import config
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"MASHACAP"
+VERSION = 1
+FILE_HEADER = struct.Struct("<8sBd")
+RECORD_HEADER = struct.Struct("<BdI")
+CAPTURE_SUFFIX = ".mcap"
+
+AUDIO_IN = 1
+TRANSCRIPT = 2
+LLM_RESPONSE = 3
+TTS_RESPONSE = 4
+STAGE = 5
+KIND_NAMES = {AUDIO_IN: "audio_in", TRANSCRIPT: "transcript", LLM_RESPONSE: "llm", TTS_RESPONSE: "tts", STAGE: "stage"}
+
+_capture_ids = itertools.count(1)
+
+
+class Record(NamedTuple):
+    kind: int
+    t: float
+    meta: Dict[str, Any]
+    data: bytes
+
+
+class SessionRecorder:
+    """Writes one session's events to a capture file. Safe to call from the STT thread."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        # "x": a name collision must fail, not interleave two sessions in one file
+        self._file = open(path, "xb")
+        self._file.write(FILE_HEADER.pack(MAGIC, VERSION, time.time()))
+
+    def _write(self, kind: int, payload: bytes):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(RECORD_HEADER.pack(kind, time.monotonic() - self._start, len(payload)))
+            self._file.write(payload)
+
+    def _write_event(self, kind: int, meta: Dict[str, Any], data: bytes = b""):
+        self._write(kind, json.dumps(meta).encode("utf-8") + b"\n" + data)
+        # Audio frames stay buffered; events are flushed so a live capture can be tailed
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+
+    def audio(self, frame: bytes):
+        self._write(AUDIO_IN, frame)
+
+    def transcript(self, text: str):
+        self._write_event(TRANSCRIPT, {"text": text})
+
+    def llm(self, turn: int, text: str):
+        self._write_event(LLM_RESPONSE, {"turn": turn, "text": text})
+
+    def tts(self, turn: int, text: str, audio: bytes):
+        self._write_event(TTS_RESPONSE, {"turn": turn, "text": text}, audio)
+
+    def stage(self, turn: int, name: str):
+        self._write_event(STAGE, {"turn": turn, "stage": name})
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class NullRecorder:
+    """Stands in for SessionRecorder when capture is disabled."""
+
+    def audio(self, frame: bytes):
+        pass
+
+    def transcript(self, text: str):
+        pass
+
+    def llm(self, turn: int, text: str):
+        pass
+
+    def tts(self, turn: int, text: str, audio: bytes):
+        pass
+
+    def stage(self, turn: int, name: str):
+        pass
+
+    def close(self):
+        pass
+
+
+NULL_RECORDER = NullRecorder()
+
+
+def start_session(capture_dir: Optional[str] = None):
+    """Returns a recorder for a new session, or NULL_RECORDER when CAPTURE_DIR is not set."""
+    capture_dir = capture_dir or config.CAPTURE_DIR
+    if not capture_dir:
+        return NULL_RECORDER
+    try:
+        directory = Path(capture_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        # The pid keeps names unique across uvicorn workers and restarts within a second
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_capture_ids)}{CAPTURE_SUFFIX}"
+        return SessionRecorder(directory / name)
+    except OSError as e:
+        logger.error(f"Could not start session capture: {e}")
+        return NULL_RECORDER
+
+
+def read_capture(path) -> Iterator[Record]:
+    """Yields the records of a capture file in order."""
+    with open(path, "rb") as f:
+        header = f.read(FILE_HEADER.size)
+        if len(header) < FILE_HEADER.size:
+            raise ValueError(f"{path} is not a capture file")
+        magic, version, _ = FILE_HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} capture file")
+
+        while True:
+            raw = f.read(RECORD_HEADER.size)
+            if len(raw) < RECORD_HEADER.size:
+                return
+            kind, t, length = RECORD_HEADER.unpack(raw)
+            payload = f.read(length)
+            if len(payload) < length:
+                logger.warning(f"{path}: truncated record at the end of the capture")
+                return
+            if kind == AUDIO_IN:
+                yield Record(kind, t, {}, payload)
+            else:
+                meta, _, data = payload.partition(b"\n")
+                yield Record(kind, t, json.loads(meta), data)
+
+
+def turn_timings(records) -> Dict[int, Dict[str, float]]:
+    """
+    Derives per-turn latencies in seconds from a capture's stage and response records:
+    llm (llm_start -> response), tts (sum of tts_start -> response), first_audio
+    (turn_start -> first audio_queued) and total (turn_start -> turn_end).
+    """
+    turns: Dict[int, Dict[str, float]] = {}
+    marks: Dict[int, Dict[str, float]] = {}
+    for record in records:
+        turn = record.meta.get("turn")
+        if turn is None:
+            continue
+        timings = turns.setdefault(turn, {})
+        turn_marks = marks.setdefault(turn, {})
+        if record.kind == STAGE:
+            turn_marks[record.meta["stage"]] = record.t
+            if record.meta["stage"] == "audio_queued" and "turn_start" in turn_marks:
+                timings.setdefault("first_audio", record.t - turn_marks["turn_start"])
+            elif record.meta["stage"] == "turn_end" and "turn_start" in turn_marks:
+                timings["total"] = record.t - turn_marks["turn_start"]
+        elif record.kind == LLM_RESPONSE and "llm_start" in turn_marks:
+            timings["llm"] = record.t - turn_marks["llm_start"]
+        elif record.kind == TTS_RESPONSE and "tts_start" in turn_marks:
+            timings["tts"] = timings.get("tts", 0.0) + record.t - turn_marks["tts_start"]
+    return turns
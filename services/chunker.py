@@ -0,0 +1,187 @@
+# services/chunker.py
+import re
+from typing import List, Optional
+
+# Words that end in a period but do not end a sentence
+ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc",
+    "inc", "ltd", "co", "mt", "e.g", "i.e", "a.m", "p.m", "u.s", "u.k",
+}
+# Abbreviations only when a number follows ("No. 5"); otherwise an ordinary word ("No.")
+NUMBER_ABBREVIATIONS = {"no", "nos", "vol", "pp"}
+
+# Sentence end: terminal punctuation, optional closing quotes/brackets, then whitespace
+SENTENCE_END_RE = re.compile(r"[.?!…]+[\"')\]]*\s+")
+# Clause end: a comma, semicolon, colon or dash followed by whitespace
+CLAUSE_END_RE = re.compile(r"(?:[,;:]|\s[-–—])\s+")
+
+
+def _word_before(text: str, punct_index: int) -> str:
+    """The lower-cased word ending at punct_index, without leading quotes or brackets."""
+    word_start = punct_index
+    while word_start > 0 and not text[word_start - 1].isspace():
+        word_start -= 1
+    return text[word_start:punct_index].lstrip("\"'([").lower()
+
+
+class SentenceChunker:
+    """
+    Incrementally turns streamed or complete text into TTS-sized units.
+
+    Sentences shorter than min_chars are merged with their neighbours so a
+    bare "Wow!" does not cost its own TTS round trip, and anything longer
+    than max_chars is split at clause boundaries (then words) so a run-on
+    sentence does not hold back the first audio. The first unit of a reply
+    has its own bounds, first_min_chars and first_max_chars, so it can go
+    out as soon as a short opener is complete: merging the opener would cut
+    TTS calls but delay the first audio.
+
+    Usage:
+        chunker = SentenceChunker(min_chars=40, max_chars=220)
+        for piece in stream:
+            for unit in chunker.feed(piece):
+                speak(unit)
+        for unit in chunker.flush():
+            speak(unit)
+    """
+
+    def __init__(self, min_chars: int = 40, max_chars: int = 220, first_max_chars: Optional[int] = None,
+                 first_min_chars: Optional[int] = None):
+        first_max_chars = first_max_chars or max_chars
+        first_min_chars = first_min_chars or min_chars
+        if min_chars < 1 or max_chars < min_chars or not min_chars <= first_max_chars <= max_chars:
+            raise ValueError("Chunk bounds must satisfy 1 <= min_chars <= first_max_chars <= max_chars.")
+        if not 1 <= first_min_chars <= first_max_chars:
+            raise ValueError("First chunk bounds must satisfy 1 <= first_min_chars <= first_max_chars.")
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.first_min_chars = first_min_chars
+        self.first_max_chars = first_max_chars
+        self._buffer = ""
+        self._pending = ""
+        self._emitted = 0
+
+    @property
+    def _limit(self) -> int:
+        return self.max_chars if self._emitted else self.first_max_chars
+
+    @property
+    def _minimum(self) -> int:
+        return self.min_chars if self._emitted else self.first_min_chars
+
+    def feed(self, text: str) -> List[str]:
+        """Adds text to the buffer and returns any units that are ready to be spoken."""
+        self._buffer += text
+        ready = []
+
+        while True:
+            end = self._find_sentence_end(self._buffer)
+            if end is None:
+                break
+            sentence, self._buffer = self._buffer[:end], self._buffer[end:]
+            self._push_sentence(sentence, ready)
+
+        # A run-on sentence with no terminator yet: release complete clauses early
+        while len(self._buffer) > self._limit:
+            cut = self._find_split(self._buffer, self._limit, require_whitespace=True)
+            if cut is None:
+                break
+            head, self._buffer = self._buffer[:cut], self._buffer[cut:]
+            self._push(head.strip(), ready)
+
+        return ready
+
+    def flush(self) -> List[str]:
+        """Returns everything still buffered, regardless of min_chars."""
+        ready = []
+        rest, self._buffer = self._buffer, ""
+        if rest.strip():
+            self._push_sentence(rest, ready)
+        if self._pending:
+            self._emit(ready)
+        self._emitted = 0
+        return ready
+
+    def _find_sentence_end(self, text: str):
+        """Returns the index just past the first real sentence boundary, or None."""
+        for match in SENTENCE_END_RE.finditer(text):
+            word = _word_before(text, match.start())
+            if word in NUMBER_ABBREVIATIONS and text[match.start()] == ".":
+                if match.end() == len(text):
+                    return None  # Can't tell "No." from "No. 5" until more text arrives
+                if text[match.end()].isdigit():
+                    continue
+                return match.end()
+            if not self._is_abbreviation(text, match.start()):
+                return match.end()
+        return None
+
+    @staticmethod
+    def _is_abbreviation(text: str, punct_index: int) -> bool:
+        """True if the period at punct_index belongs to an abbreviation or an initial."""
+        if text[punct_index] != ".":
+            return False
+        word = _word_before(text, punct_index)
+        if not word:
+            return False
+        # Single letters are initials ("J. R. R. Tolkien")
+        if len(word) == 1 and word.isalpha():
+            return True
+        return word in ABBREVIATIONS
+
+    def _push_sentence(self, sentence: str, ready: List[str]):
+        sentence = sentence.strip()
+        while len(sentence) > self._limit:
+            cut = self._find_split(sentence, self._limit)
+            self._push(sentence[:cut].strip(), ready)
+            sentence = sentence[cut:].strip()
+        if sentence:
+            self._push(sentence, ready)
+
+    def _push(self, piece: str, ready: List[str]):
+        """Merges a piece into the pending unit and emits it once it is big enough."""
+        if not piece:
+            return
+        if self._pending and len(self._pending) + 1 + len(piece) > self._limit:
+            self._emit(ready)
+        self._pending = f"{self._pending} {piece}" if self._pending else piece
+        if len(self._pending) >= self._minimum:
+            self._emit(ready)
+
+    def _emit(self, ready: List[str]):
+        ready.append(self._pending)
+        self._pending = ""
+        self._emitted += 1
+
+    @staticmethod
+    def _find_split(text: str, limit: int, require_whitespace: bool = False):
+        """
+        Finds where to cut text so the head fits in limit characters.
+        Prefers the last clause boundary, then the last space. Returns None
+        when require_whitespace is set and there is no safe place to cut yet.
+        """
+        window = text[:limit + 1]
+        clause_cuts = [m.end() for m in CLAUSE_END_RE.finditer(window) if m.end() <= limit + 1]
+        if clause_cuts and clause_cuts[-1] > limit // 3:
+            return clause_cuts[-1]
+        space = window.rfind(" ")
+        if space > 0:
+            return space + 1
+        if require_whitespace:
+            return None
+        return limit
+
+
+def chunk_text(text: str, min_chars: int = 40, max_chars: int = 220, first_max_chars: Optional[int] = None,
+               first_min_chars: Optional[int] = None) -> List[str]:
+    """Splits a complete reply into TTS units."""
+    chunker = SentenceChunker(min_chars=min_chars, max_chars=max_chars, first_max_chars=first_max_chars,
+                              first_min_chars=first_min_chars)
+    chunks = chunker.feed(text) + chunker.flush()
+    # The whole reply is known, so a short tail can still ride along with the
+    # previous unit (but never with a first unit that has its own bounds)
+    mergeable = len(chunks) > 2 or (len(chunks) == 2 and not (first_max_chars or first_min_chars))
+    if mergeable and len(chunks[-1]) < min_chars and len(chunks[-2]) + 1 + len(chunks[-1]) <= max_chars:
+        tail = chunks.pop()
+        chunks[-1] = f"{chunks[-1]} {tail}"
+    return chunks
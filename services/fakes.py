@@ -0,0 +1,130 @@
+# services/fakes.py
+"""
+Local stand-ins for AssemblyAI, Gemini and Murf, used by replay.py and the
+benchmarks to drive main.py without network access or API keys.
+"""
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+import threading
+import time
+
+from . import stt, llm, tts
+
+logger = logging.getLogger(__name__)
+
+# Half a second of 16 kHz mono PCM silence, returned for text the fake has no audio for
+SILENCE = b"\x00" * 16000
+
+
+class TranscriptScript:
+    """
+    Scripted transcripts shared by every FakeTranscriber it creates, so a
+    transcriber reopened after an idle release carries on where the last one
+    stopped. `script` is a list of (frame_count, delay_seconds, text): once
+    frame_count frames have been streamed in total, text is delivered as a
+    final transcript after the delay. Call the instance in place of
+    stt.AssemblyAIStreamingTranscriber; one instance covers one session.
+    """
+
+    def __init__(self, script: Iterable[Tuple[int, float, str]] = (), speed: float = 1.0):
+        self.frames = 0
+        self._script = deque(sorted(script, key=lambda entry: entry[0]))
+        self._speed = speed
+        self._lock = threading.Lock()
+
+    def __call__(self, api_key=None, sample_rate: int = 16000, on_partial_callback=None, on_final_callback=None):
+        return FakeTranscriber(on_partial_callback=on_partial_callback, on_final_callback=on_final_callback,
+                               source=self)
+
+    def advance(self) -> List[Tuple[float, str]]:
+        """Counts one streamed frame; returns the (delay, text) entries that became due."""
+        with self._lock:
+            self.frames += 1
+            due = []
+            while self._script and self._script[0][0] <= self.frames:
+                _, delay, text = self._script.popleft()
+                due.append((delay / self._speed, text))
+        return due
+
+
+class FakeTranscriber:
+    """
+    Drop-in for stt.AssemblyAIStreamingTranscriber, fed by a TranscriptScript.
+    Given a `script` instead of a `source`, it gets a private one, so each
+    instance starts the script from frame 0. Transcripts are delivered from a
+    timer thread like the real client's callback thread.
+    """
+
+    def __init__(self, api_key=None, sample_rate: int = 16000, on_partial_callback=None, on_final_callback=None,
+                 script: Iterable[Tuple[int, float, str]] = (), speed: float = 1.0,
+                 source: Optional[TranscriptScript] = None):
+        self.on_partial_callback = on_partial_callback
+        self.on_final_callback = on_final_callback
+        self.closed = False
+        self._source = source or TranscriptScript(script, speed)
+
+    def stream_audio(self, audio_chunk: bytes):
+        for delay, text in self._source.advance():
+            timer = threading.Timer(delay, self._deliver, args=(text,))
+            timer.daemon = True
+            timer.start()
+
+    def _deliver(self, text: str):
+        if not self.closed and self.on_final_callback:
+            self.on_final_callback(text)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeLLM:
+    """Replaces llm.get_llm_response, answering calls in order from scripted (text, latency) pairs."""
+
+    def __init__(self, responses: List[Tuple[str, float]] = (), speed: float = 1.0,
+                 default: Tuple[str, float] = ("Hi Mishka! Let's play!", 0.0)):
+        self._responses = deque(responses)
+        self._speed = speed
+        self._default = default
+        self._lock = threading.Lock()
+
+    def __call__(self, user_query: str, history):
+        with self._lock:
+            text, latency = self._responses.popleft() if self._responses else self._default
+        time.sleep(latency / self._speed)
+        return text, list(history) + [("user", user_query), ("model", text)]
+
+
+class FakeTTS:
+    """Replaces tts.speak, returning scripted audio for each chunk text after its recorded latency."""
+
+    def __init__(self, clips: Optional[Dict[str, List[Tuple[bytes, float]]]] = None, speed: float = 1.0,
+                 default_latency: float = 0.0):
+        self._clips = {text: deque(entries) for text, entries in (clips or {}).items()}
+        self._speed = speed
+        self._default_latency = default_latency
+        self._lock = threading.Lock()
+
+    def __call__(self, text: str, output_file: str = "stream_output.wav"):
+        with self._lock:
+            queue = self._clips.get(text)
+            audio, latency = queue.popleft() if queue else (None, self._default_latency)
+        if audio is None:
+            logger.warning(f"No recorded audio for chunk {text[:40]!r}, returning silence")
+            audio = SILENCE
+        time.sleep(latency / self._speed)
+        return audio
+
+
+@contextmanager
+def installed(transcriber_factory: Callable, llm_fn: Callable, tts_fn: Callable):
+    """Patches the stt, llm and tts service modules for the duration of the block."""
+    originals = (stt.AssemblyAIStreamingTranscriber, llm.get_llm_response, tts.speak)
+    stt.AssemblyAIStreamingTranscriber = transcriber_factory
+    llm.get_llm_response = llm_fn
+    tts.speak = tts_fn
+    try:
+        yield
+    finally:
+        stt.AssemblyAIStreamingTranscriber, llm.get_llm_response, tts.speak = originals
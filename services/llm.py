@@ -2,8 +2,9 @@
 
 import google.generativeai as genai
 import os
-from typing import List, Dict, Any, Tuple
+from typing import List, Optional, Tuple
 from . import news  # Import the news service
+from .resilience import news_provider, Provider, ProviderUnavailable
 
 # Configure logging
 import logging
@@ -36,34 +37,31 @@ Rules:
 Goal: Help the user with their questions while staying in character as Masha.
 """
 
+# Returned when Gemini fails; callers compare against it to detect an upstream failure
+ERROR_RESPONSE = "Oh no! I got a bit confused there, Mishka! Can you ask me again?"
 
-def get_llm_response(user_query: str, history: List[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]]]:
-    """Gets a response from the Gemini LLM and updates chat history."""
+
+def get_llm_response(user_query: str, history: List[Tuple[str, str]],
+                     news_source: Optional[Provider] = None) -> Tuple[str, List[Tuple[str, str]]]:
+    """
+    Gets a response from the Gemini LLM and returns it with the updated chat history.
+    History is a list of compact (role, text) records rather than SDK content objects.
+    News lookups go through news_source, the live news provider by default.
+    """
     try:
         # Check if user is asking for news
         enhanced_query = user_query
+        history_query = user_query
 
         if news.should_fetch_news(user_query):
             logger.info("User query detected as news-related, fetching latest news...")
 
-            # Try to fetch relevant news
-            if "technology" in user_query.lower() or "tech" in user_query.lower():
-                articles = news.fetch_top_headlines(category="technology")
-            elif "sports" in user_query.lower():
-                articles = news.fetch_top_headlines(category="sports")
-            elif "health" in user_query.lower():
-                articles = news.fetch_top_headlines(category="health")
-            elif "business" in user_query.lower():
-                articles = news.fetch_top_headlines(category="business")
-            elif "science" in user_query.lower():
-                articles = news.fetch_top_headlines(category="science")
-            else:
-                # Search for specific keywords or get general headlines
-                search_terms = extract_search_terms(user_query)
-                if search_terms:
-                    articles = news.search_news(search_terms)
-                else:
-                    articles = news.fetch_top_headlines()
+            # Try to fetch relevant news; skip it straight away if NewsAPI is rate limited or down
+            try:
+                articles = fetch_relevant_news(user_query, news_source or news_provider)
+            except ProviderUnavailable as e:
+                logger.warning(f"Skipping news enrichment: {e}")
+                articles = None
 
             if articles:
                 news_context = news.format_news_for_llm(articles)
@@ -76,18 +74,45 @@ def get_llm_response(user_query: str, history: List[Dict[str, Any]]) -> Tuple[st
                 Please respond to the user's question using this news information if relevant, 
                 but stay in character as Masha and make it sound exciting and fun!
                 """
+                # History keeps a short form of the articles rather than the whole prompt
+                history_query = f"{user_query}\n\n[News shared with Masha]\n{news.format_news_for_history(articles)}"
                 logger.info(f"Enhanced query with {len(articles)} news articles")
             else:
                 logger.warning("Failed to fetch news articles")
 
         model = genai.GenerativeModel('gemini-1.5-flash', system_instruction=system_instructions)
-        chat = model.start_chat(history=history)
+        chat = model.start_chat(history=[{"role": role, "parts": [text]} for role, text in history])
         response = chat.send_message(enhanced_query)
-        return response.text, chat.history
+        # Record the user's words and the news headlines, not the whole enhanced prompt
+        return response.text, list(history) + [("user", history_query), ("model", response.text)]
 
     except Exception as e:
         logger.error(f"Error getting LLM response: {e}")
-        return "Oh no! I got a bit confused there, Mishka! Can you ask me again?", history
+        return ERROR_RESPONSE, history
+
+
+def fetch_relevant_news(user_query: str, provider: Provider = news_provider):
+    """Fetches headlines for the category mentioned in the query, or searches by keywords."""
+    def failed(articles):
+        return articles is None
+
+    query_lower = user_query.lower()
+    if "technology" in query_lower or "tech" in query_lower:
+        return provider.call(news.fetch_top_headlines, category="technology", is_failure=failed)
+    elif "sports" in query_lower:
+        return provider.call(news.fetch_top_headlines, category="sports", is_failure=failed)
+    elif "health" in query_lower:
+        return provider.call(news.fetch_top_headlines, category="health", is_failure=failed)
+    elif "business" in query_lower:
+        return provider.call(news.fetch_top_headlines, category="business", is_failure=failed)
+    elif "science" in query_lower:
+        return provider.call(news.fetch_top_headlines, category="science", is_failure=failed)
+
+    # Search for specific keywords or get general headlines
+    search_terms = extract_search_terms(user_query)
+    if search_terms:
+        return provider.call(news.search_news, search_terms, is_failure=failed)
+    return provider.call(news.fetch_top_headlines, is_failure=failed)
 
 
 def extract_search_terms(query: str) -> str:
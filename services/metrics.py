@@ -0,0 +1,49 @@
+# services/metrics.py
+from typing import Callable, Dict, Iterable, List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# A collector returns (metric_name, labels, value) samples when /metrics is scraped
+Sample = Tuple[str, Dict[str, str], float]
+Collector = Callable[[], Iterable[Sample]]
+
+_collectors: List[Collector] = []
+_help: Dict[str, str] = {}
+_types: Dict[str, str] = {}
+
+GAUGE = "gauge"
+COUNTER = "counter"
+
+
+def register_collector(collector: Collector, help_text: Dict[str, str] = None, types: Dict[str, str] = None):
+    """
+    Registers a callable that reports samples, with optional HELP text and
+    Prometheus type per metric name. Metrics without a declared type are gauges.
+    """
+    _collectors.append(collector)
+    if help_text:
+        _help.update(help_text)
+    if types:
+        _types.update(types)
+
+
+def render() -> str:
+    """Renders all collected samples in the Prometheus text exposition format."""
+    grouped: Dict[str, List[Tuple[Dict[str, str], float]]] = {}
+    for collector in _collectors:
+        try:
+            for name, labels, value in collector():
+                grouped.setdefault(name, []).append((labels, value))
+        except Exception as e:
+            logger.error(f"Metrics collector failed: {e}")
+
+    lines = []
+    for name, samples in grouped.items():
+        if name in _help:
+            lines.append(f"# HELP {name} {_help[name]}")
+        lines.append(f"# TYPE {name} {_types.get(name, GAUGE)}")
+        for labels, value in samples:
+            label_str = ",".join(f'{key}="{val}"' for key, val in labels.items())
+            lines.append(f"{name}{{{label_str}}} {value}" if label_str else f"{name} {value}")
+    return "\n".join(lines) + "\n"
@@ -30,7 +30,7 @@ def fetch_top_headlines(country: str = "us", category: str = None, page_size: in
         params["category"] = category
 
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = requests.get(url, params=params, timeout=config.NEWS_TIMEOUT)
         response.raise_for_status()
         data = response.json()
 
@@ -64,7 +64,7 @@ def search_news(query: str, sort_by: str = "relevancy", page_size: int = 5, news
     }
 
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = requests.get(url, params=params, timeout=config.NEWS_TIMEOUT)
         response.raise_for_status()
         data = response.json()
 
@@ -100,6 +100,23 @@ def format_news_for_llm(articles: List[Dict[str, Any]], max_articles: int = 3) -
     return formatted_news
 
 
+def format_news_for_history(articles: List[Dict[str, Any]], max_articles: int = 3,
+                            max_description: int = 160) -> str:
+    """
+    Compact form of format_news_for_llm kept in chat history, so follow-ups
+    ("tell me more about the second story") still know what was shared
+    """
+    lines = []
+    for i, article in enumerate(articles[:max_articles], 1):
+        title = article.get("title") or "No title"
+        source = (article.get("source") or {}).get("name") or "Unknown source"
+        description = (article.get("description") or "").strip()
+        if len(description) > max_description:
+            description = description[:max_description].rsplit(" ", 1)[0] + "..."
+        lines.append(f"{i}. {title} ({source})" + (f" - {description}" if description else ""))
+    return "\n".join(lines)
+
+
 def should_fetch_news(user_query: str) -> bool:
     """
     Determine if the user query is asking for news or current events
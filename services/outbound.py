@@ -0,0 +1,186 @@
+# services/outbound.py
+from collections import deque
+from typing import Any, Dict
+import asyncio
+import itertools
+import json
+import logging
+import time
+import weakref
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+DROP_AUDIO = "drop_audio"
+DISCONNECT = "disconnect"
+SLOW_CLIENT_POLICIES = (DROP_AUDIO, DISCONNECT)
+
+# Close code sent when a slow client is disconnected (1008 = policy violation)
+SLOW_CLIENT_CLOSE_CODE = 1008
+
+_session_ids = itertools.count(1)
+_active_queues = weakref.WeakSet()
+
+
+class OutboundQueue:
+    """
+    Per-connection outbound writer. Messages are serialised once and queued
+    without awaiting the socket, so a slow client never holds up the turn
+    that produced them. A single writer task drains the queue, always sending
+    control messages (transcripts, replies) ahead of audio.
+
+    The queue is bounded by bytes. When it overflows, the slow-client policy
+    decides what happens:
+      - "drop_audio": discard the oldest queued audio (and audio older than
+        max_audio_age seconds at send time); control messages are kept
+      - "disconnect": close the socket
+
+    Under "drop_audio", control messages bypass the byte bound: they are
+    queued even when no audio is left to drop, so queued_bytes can exceed
+    max_bytes by the size of the pending control messages. They are small
+    and losing a transcript or reply would break the conversation.
+    """
+
+    def __init__(self, websocket, max_bytes: int, policy: str = DROP_AUDIO, max_audio_age: float = 10.0):
+        if policy not in SLOW_CLIENT_POLICIES:
+            raise ValueError(f"Unknown slow-client policy '{policy}', expected one of {SLOW_CLIENT_POLICIES}")
+        self.session_id = str(next(_session_ids))
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.max_audio_age = max_audio_age
+        self.closed = False
+        self.stats = {
+            "queued_bytes": 0, "queued_messages": 0, "sent_messages": 0, "sent_bytes": 0,
+            "dropped_audio": 0, "send_latency_ms_max": 0.0, "send_latency_ms_total": 0.0,
+            "queue_delay_ms_max": 0.0,
+        }
+        self._websocket = websocket
+        self._control = deque()
+        self._audio = deque()
+        self._ready = asyncio.Event()
+        self._writer = asyncio.create_task(self._write_loop())
+        self._closing = None
+        _active_queues.add(self)
+
+    def send(self, message: Dict[str, Any]):
+        """Queues a JSON message for the client. Never blocks."""
+        if self.closed:
+            return
+        text = json.dumps(message)
+        size = len(text)
+        is_audio = message.get("type") == "audio"
+
+        if self.stats["queued_bytes"] + size > self.max_bytes:
+            if self.policy == DISCONNECT:
+                logger.warning(f"Session {self.session_id}: outbound queue full, disconnecting slow client.")
+                self._disconnect()
+                return
+            self._drop_oldest_audio(self.stats["queued_bytes"] + size - self.max_bytes)
+            if is_audio and self.stats["queued_bytes"] + size > self.max_bytes:
+                self.stats["dropped_audio"] += 1
+                return
+
+        (self._audio if is_audio else self._control).append((time.monotonic(), text))
+        self.stats["queued_bytes"] += size
+        self.stats["queued_messages"] += 1
+        self._ready.set()
+
+    async def close(self):
+        """Stops the writer; anything still queued is discarded."""
+        self.closed = True
+        self._writer.cancel()
+        for task in (self._writer, self._closing):
+            if task is None:
+                continue
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    def _drop_oldest_audio(self, bytes_needed: int):
+        while bytes_needed > 0 and self._audio:
+            _, text = self._audio.popleft()
+            self._dequeued(text)
+            self.stats["dropped_audio"] += 1
+            bytes_needed -= len(text)
+
+    def _dequeued(self, text: str):
+        self.stats["queued_bytes"] -= len(text)
+        self.stats["queued_messages"] -= 1
+
+    def _next(self):
+        """Pops the next message to send, control first, skipping stale audio."""
+        if self._control:
+            return self._control.popleft()
+        while self._audio:
+            enqueued_at, text = self._audio.popleft()
+            if self.policy == DROP_AUDIO and time.monotonic() - enqueued_at > self.max_audio_age:
+                self._dequeued(text)
+                self.stats["dropped_audio"] += 1
+                continue
+            return enqueued_at, text
+        return None
+
+    def _disconnect(self):
+        self.closed = True
+        self._control.clear()
+        self._audio.clear()
+        self.stats["queued_bytes"] = 0
+        self.stats["queued_messages"] = 0
+        # send() is synchronous, so the close runs as a task that close() awaits
+        self._closing = asyncio.create_task(self._websocket.close(code=SLOW_CLIENT_CLOSE_CODE))
+        self._writer.cancel()
+
+    async def _write_loop(self):
+        while True:
+            await self._ready.wait()
+            item = self._next()
+            if item is None:
+                self._ready.clear()
+                continue
+            enqueued_at, text = item
+            self._dequeued(text)
+            start = time.monotonic()
+            try:
+                await self._websocket.send_text(text)
+            except Exception as e:
+                logger.info(f"Session {self.session_id}: outbound writer stopped: {e}")
+                self.closed = True
+                return
+            sent_at = time.monotonic()
+            latency_ms = (sent_at - start) * 1000
+            self.stats["sent_messages"] += 1
+            self.stats["sent_bytes"] += len(text)
+            self.stats["send_latency_ms_total"] += latency_ms
+            self.stats["send_latency_ms_max"] = max(self.stats["send_latency_ms_max"], latency_ms)
+            self.stats["queue_delay_ms_max"] = max(self.stats["queue_delay_ms_max"], (sent_at - enqueued_at) * 1000)
+
+
+def _collect():
+    for queue in list(_active_queues):
+        if queue.closed:
+            continue
+        labels = {"session": queue.session_id}
+        stats = queue.stats
+        yield "masha_ws_queued_bytes", labels, stats["queued_bytes"]
+        yield "masha_ws_queued_messages", labels, stats["queued_messages"]
+        yield "masha_ws_sent_messages_total", labels, stats["sent_messages"]
+        yield "masha_ws_sent_bytes_total", labels, stats["sent_bytes"]
+        yield "masha_ws_dropped_audio_total", labels, stats["dropped_audio"]
+        yield "masha_ws_send_latency_ms_max", labels, round(stats["send_latency_ms_max"], 3)
+        avg = stats["send_latency_ms_total"] / stats["sent_messages"] if stats["sent_messages"] else 0.0
+        yield "masha_ws_send_latency_ms_avg", labels, round(avg, 3)
+        yield "masha_ws_queue_delay_ms_max", labels, round(stats["queue_delay_ms_max"], 3)
+
+
+metrics.register_collector(_collect, {
+    "masha_ws_queued_bytes": "Bytes waiting in the session's outbound queue",
+    "masha_ws_dropped_audio_total": "Audio messages dropped for a slow client",
+    "masha_ws_send_latency_ms_max": "Slowest single websocket send for the session",
+    "masha_ws_queue_delay_ms_max": "Longest time a message waited between queueing and sending",
+}, {
+    "masha_ws_sent_messages_total": metrics.COUNTER,
+    "masha_ws_sent_bytes_total": metrics.COUNTER,
+    "masha_ws_dropped_audio_total": metrics.COUNTER,
+})
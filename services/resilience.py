@@ -0,0 +1,312 @@
+# services/resilience.py
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import functools
+import logging
+import threading
+import time
+
+import config
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class ProviderUnavailable(Exception):
+    """
+    Raised when a provider's circuit is open or a call misses its deadline,
+    including deadlines missed while waiting for a rate-limit token or a slot.
+    """
+
+
+class TokenBucket:
+    """Thread-safe token bucket; refills at `rate` tokens per second up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """
+        Takes a token, borrowing against the refill if none is left. Returns the
+        seconds to wait before using it, or None (taking nothing) if that wait
+        would exceed max_wait. Borrowed tokens keep waiting callers in order.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if wait > max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and refuses calls
+    until `reset_timeout` seconds have passed. Then a single probe call is
+    let through (half-open); its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_count = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def release_probe(self):
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.opened_count += 1
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+
+
+class Provider:
+    """
+    Guards calls to one upstream (tts, llm, news) with a rate limiter, a
+    concurrency cap, a deadline and a circuit breaker. Blocking calls run on
+    the provider's own small thread pool so a hung upstream cannot exhaust
+    the default executor.
+
+    Calls that hit the rate limit or the concurrency cap wait for a token or
+    a slot, within the deadline; the wait counts against it. Only an open
+    circuit or a missed deadline raises ProviderUnavailable. A provider built
+    with wait_for_capacity=False refuses such calls at once instead, for
+    optional lookups that are better skipped than waited for.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, timeout: float, max_concurrency: int,
+                 failure_threshold: int, reset_timeout: float, wait_for_capacity: bool = True):
+        self.name = name
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.wait_for_capacity = wait_for_capacity
+        self.limiter = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=f"{name}-call")
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "failures": 0, "timeouts": 0, "rejected": 0}
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _remaining(self, deadline: float) -> float:
+        return max(0.0, deadline - time.monotonic()) if self.wait_for_capacity else 0.0
+
+    def _admit(self, deadline: float) -> float:
+        """
+        Checks the breaker and takes a rate-limit token. Returns the seconds to
+        wait before the call may start.
+        """
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise ProviderUnavailable(f"{self.name} circuit is open")
+        delay = self.limiter.reserve(self._remaining(deadline))
+        if delay is None:
+            self._refuse("rate limit exceeded")
+        return delay
+
+    def _refuse(self, reason: str):
+        self._count("rejected")
+        # A refused half-open probe must not leave the breaker waiting on it
+        self.breaker.release_probe()
+        raise ProviderUnavailable(f"{self.name} {reason}")
+
+    def _run(self, fn: Callable, args, kwargs, deadline: float, started: threading.Event):
+        # Also reached for calls the caller already gave up on; those must not start
+        if time.monotonic() >= deadline or not self._slots.acquire(timeout=self._remaining(deadline)):
+            return None
+        with self._lock:
+            self._in_flight += 1
+            self.stats["calls"] += 1
+        started.set()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+    def _count(self, stat: str):
+        # Stats are bumped from the event loop and from worker threads
+        with self._lock:
+            self.stats[stat] += 1
+
+    def stats_snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats)
+
+    def _record(self, failed: bool):
+        if failed:
+            self._count("failures")
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def call(self, fn: Callable, *args, is_failure: Optional[Callable[[Any], bool]] = None, **kwargs):
+        """
+        Runs fn in the calling thread. The deadline cannot interrupt it, so fn
+        should carry its own timeout; overrunning it still counts as a failure.
+        """
+        deadline = time.monotonic() + self.timeout
+        time.sleep(self._admit(deadline))
+        started = threading.Event()
+        try:
+            result = self._run(fn, args, kwargs, deadline, started)
+        except Exception:
+            self._record(failed=True)
+            raise
+        if not started.is_set():
+            self._refuse("concurrency limit reached")
+        overran = time.monotonic() > deadline
+        if overran:
+            self._count("timeouts")
+        self._record(failed=overran or bool(is_failure and is_failure(result)))
+        return result
+
+    async def call_async(self, fn: Callable, *args, is_failure: Optional[Callable[[Any], bool]] = None, **kwargs):
+        """Runs blocking fn on the provider's pool and gives up after the deadline."""
+        deadline = time.monotonic() + self.timeout
+        delay = self._admit(deadline)
+        if delay:
+            await asyncio.sleep(delay)
+        started = threading.Event()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, functools.partial(self._run, fn, args, kwargs, deadline, started))
+        try:
+            result = await asyncio.wait_for(future, max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            if not started.is_set():
+                # Never reached the upstream, so the breaker has nothing to learn from it
+                self._refuse(f"had no free slot within {self.timeout}s")
+            self._count("timeouts")
+            self._record(failed=True)
+            raise ProviderUnavailable(f"{self.name} timed out after {self.timeout}s")
+        except Exception:
+            self._record(failed=True)
+            raise
+        if not started.is_set():
+            self._refuse("concurrency limit reached")
+        self._record(failed=bool(is_failure and is_failure(result)))
+        return result
+
+
+class LRUCache:
+    """Small thread-safe LRU map, used to replay recent TTS audio when Murf is unavailable."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+def _make_provider(name: str, prefix: str, timeout: float, wait_for_capacity: bool = True) -> Provider:
+    return Provider(
+        name,
+        rate=getattr(config, f"{prefix}_RATE_LIMIT"),
+        burst=getattr(config, f"{prefix}_BURST"),
+        timeout=timeout,
+        max_concurrency=getattr(config, f"{prefix}_MAX_CONCURRENCY"),
+        failure_threshold=config.BREAKER_FAILURE_THRESHOLD,
+        reset_timeout=config.BREAKER_RESET_SECONDS,
+        wait_for_capacity=wait_for_capacity,
+    )
+
+
+tts_provider = _make_provider("tts", "TTS", config.TTS_TIMEOUT)
+llm_provider = _make_provider("llm", "LLM", config.LLM_TIMEOUT)
+# News only enriches an LLM prompt, so a busy news provider is skipped rather than waited for
+news_provider = _make_provider("news", "NEWS", config.NEWS_TIMEOUT, wait_for_capacity=False)
+PROVIDERS = {p.name: p for p in (tts_provider, llm_provider, news_provider)}
+
+tts_cache = LRUCache(config.TTS_CACHE_SIZE)
+
+
+def _collect():
+    for provider in PROVIDERS.values():
+        labels = {"provider": provider.name}
+        yield "masha_breaker_state", labels, STATE_VALUES[provider.breaker.state]
+        yield "masha_breaker_consecutive_failures", labels, provider.breaker.failures
+        yield "masha_breaker_opened_total", labels, provider.breaker.opened_count
+        yield "masha_provider_in_flight", labels, provider.in_flight
+        for stat, value in provider.stats_snapshot().items():
+            yield f"masha_provider_{stat}_total", labels, value
+    yield "masha_tts_cache_entries", {}, len(tts_cache)
+
+
+metrics.register_collector(_collect, {
+    "masha_breaker_state": "Circuit breaker state (0=closed, 1=half-open, 2=open)",
+    "masha_breaker_consecutive_failures": "Consecutive failures seen by the breaker",
+    "masha_breaker_opened_total": "Times the breaker has opened",
+    "masha_provider_in_flight": "Calls currently running against the provider",
+    "masha_provider_rejected_total": "Calls refused by the breaker, or that got no token or slot before the deadline",
+}, types={
+    "masha_breaker_opened_total": metrics.COUNTER,
+    "masha_provider_calls_total": metrics.COUNTER,
+    "masha_provider_failures_total": metrics.COUNTER,
+    "masha_provider_timeouts_total": metrics.COUNTER,
+    "masha_provider_rejected_total": metrics.COUNTER,
+})
@@ -0,0 +1,172 @@
+# services/session.py
+from typing import Callable, List, Optional, Tuple
+import asyncio
+import functools
+import logging
+import time
+import weakref
+
+import config
+from . import stt, metrics
+
+logger = logging.getLogger(__name__)
+
+# Conversation history is kept as (role, text) records, roles as Gemini names them
+HistoryRecord = Tuple[str, str]
+
+_sessions = weakref.WeakSet()
+
+
+class Session:
+    """
+    State for one /ws connection. Slotted and free of per-connection closures
+    because thousands of these may sit idle at once. The upstream STT
+    connection is opened lazily and released after STT_IDLE_SECONDS without
+    audio; the next audio frame reopens it. Connecting blocks on the network,
+    so it runs in a worker thread while incoming audio is buffered.
+    """
+
+    __slots__ = (
+        "websocket", "loop", "outbox", "recorder", "history", "turn_count",
+        "transcriber", "stt_enabled", "last_audio", "on_final", "connect_task",
+        "pending_audio", "pending_bytes", "retry_at", "closed", "__weakref__",
+    )
+
+    def __init__(self, websocket, loop, outbox, recorder, on_final: Callable[["Session", str], None]):
+        self.websocket = websocket
+        self.loop = loop
+        self.outbox = outbox
+        self.recorder = recorder
+        self.history: List[HistoryRecord] = []
+        self.turn_count = 0
+        self.transcriber = None
+        self.stt_enabled = False
+        self.last_audio = 0.0
+        self.on_final = on_final
+        self.connect_task: Optional[asyncio.Task] = None
+        self.pending_audio: List[bytes] = []
+        self.pending_bytes = 0
+        self.retry_at = 0.0
+        self.closed = False
+        _sessions.add(self)
+
+    def next_turn(self) -> int:
+        self.turn_count += 1
+        return self.turn_count
+
+    def set_history(self, history: List[HistoryRecord]):
+        """Stores the latest history, keeping only the most recent HISTORY_MAX_MESSAGES records."""
+        # Trim whole user/model exchanges so the history still starts with a user message
+        keep = config.HISTORY_MAX_MESSAGES - config.HISTORY_MAX_MESSAGES % 2
+        self.history = list(history[-keep:]) if keep > 0 else []
+
+    def stream_audio(self, frame: bytes):
+        """
+        Forwards a PCM frame to STT. Without a connection (released by the idle
+        reaper, or still connecting) the frame is buffered and a reconnect is
+        started if none is pending.
+        """
+        if not self.stt_enabled:
+            return
+        self.last_audio = time.monotonic()
+        if self.transcriber is None:
+            if self.connect_task is None:
+                if self.last_audio < self.retry_at:
+                    return
+                self.open_transcriber()
+            if self.pending_bytes + len(frame) > config.STT_CONNECT_BUFFER_BYTES:
+                return
+            self.pending_audio.append(frame)
+            self.pending_bytes += len(frame)
+        # Captured on arrival, so replay sends buffered frames at their real offsets
+        self.recorder.audio(frame)
+        if self.transcriber is not None:
+            self.transcriber.stream_audio(frame)
+
+    def open_transcriber(self):
+        """Starts (re)connecting STT, e.g. after new API keys, without blocking the event loop."""
+        self.stt_enabled = True
+        self.connect_task = self.loop.create_task(self._connect(self.connect_task))
+
+    async def _connect(self, previous: Optional[asyncio.Task]):
+        if previous is not None:
+            # Connects run in order, so a key update during a reconnect wins
+            await asyncio.wait([previous])
+        stale, self.transcriber = self.transcriber, None
+        try:
+            transcriber = await asyncio.to_thread(self._replace_transcriber, stale)
+        except Exception as e:
+            logger.error(f"STT connection failed, retrying in {config.STT_RETRY_SECONDS:g}s: {e}")
+            self.retry_at = time.monotonic() + config.STT_RETRY_SECONDS
+            self._drop_pending_audio()
+            return
+        finally:
+            if self.connect_task is asyncio.current_task():
+                self.connect_task = None
+
+        if self.closed:
+            await asyncio.to_thread(transcriber.close)
+            return
+        self.transcriber = transcriber
+        self.retry_at = 0.0
+        self.last_audio = time.monotonic()
+        for frame in self.pending_audio:
+            transcriber.stream_audio(frame)
+        self._drop_pending_audio()
+
+    def _replace_transcriber(self, stale):
+        """Blocking part of a (re)connect, run in a worker thread."""
+        if stale:
+            stale.close()
+        return stt.AssemblyAIStreamingTranscriber(
+            api_key=config.ASSEMBLYAI_API_KEY,
+            on_final_callback=functools.partial(self.on_final, self)
+        )
+
+    def _drop_pending_audio(self):
+        self.pending_audio = []
+        self.pending_bytes = 0
+
+    def detach_idle_transcriber(self, idle_seconds: float, now: float) -> Optional[object]:
+        """Takes the transcriber away if it has gone idle, so the caller can close it off the event loop."""
+        if self.transcriber is None or now - self.last_audio < idle_seconds:
+            return None
+        transcriber, self.transcriber = self.transcriber, None
+        return transcriber
+
+    def close(self):
+        """Releases the session; a connect still in flight closes its transcriber when it finishes."""
+        self.closed = True
+        self._drop_pending_audio()
+        transcriber, self.transcriber = self.transcriber, None
+        if transcriber:
+            # disconnect() waits on the network, keep it off the event loop
+            self.loop.run_in_executor(None, transcriber.close)
+        self.recorder.close()
+        _sessions.discard(self)
+
+
+async def release_idle_transcribers(idle_seconds: float, interval: float):
+    """Background task: closes STT connections of sessions that have not sent audio for idle_seconds."""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        now = time.monotonic()
+        for session in list(_sessions):
+            transcriber = session.detach_idle_transcriber(idle_seconds, now)
+            if transcriber:
+                logger.info("Releasing idle STT connection.")
+                # disconnect() waits on the network, keep it off the event loop
+                loop.run_in_executor(None, transcriber.close)
+
+
+def _collect():
+    sessions = list(_sessions)
+    yield "masha_sessions", {}, len(sessions)
+    yield "masha_sessions_with_stt", {}, sum(1 for session in sessions if session.transcriber is not None)
+
+
+metrics.register_collector(_collect, {
+    "masha_sessions": "Open websocket sessions",
+    "masha_sessions_with_stt": "Sessions currently holding an upstream STT connection",
+})
@@ -0,0 +1,154 @@
+# services/static_assets.py
+from pathlib import Path
+from typing import Dict, Mapping, NamedTuple, Optional, Tuple
+import gzip
+import hashlib
+import logging
+import mimetypes
+
+from fastapi import Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Fingerprinted URLs never change content, so browsers may keep them for a year
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+# Unversioned URLs (the page itself, /static/<name>) must be revalidated, which costs a 304 at most
+REVALIDATE_CACHE = "no-cache"
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+HASH_LENGTH = 12
+
+
+class Variant(NamedTuple):
+    body: bytes
+    etag: str
+
+
+class Asset:
+    """One file held in memory with its content hash and precompressed variants."""
+
+    def __init__(self, name: str, body: bytes, content_type: str):
+        self.name = name
+        self.content_type = content_type
+        self.digest = hashlib.sha256(body).hexdigest()[:HASH_LENGTH]
+        self.variants: Dict[str, Variant] = {"identity": Variant(body, f'"{self.digest}"')}
+
+        if content_type.startswith(COMPRESSIBLE_TYPES):
+            self._add_variant("gzip", gzip.compress(body, compresslevel=9, mtime=0))
+            if brotli is not None:
+                self._add_variant("br", brotli.compress(body, quality=11))
+
+    def _add_variant(self, encoding: str, body: bytes):
+        # Only worth serving if it is actually smaller
+        if len(body) < len(self.variants["identity"].body):
+            self.variants[encoding] = Variant(body, f'"{self.digest}-{encoding}"')
+
+    @property
+    def fingerprinted_name(self) -> str:
+        path = Path(self.name)
+        return str(path.with_name(f"{path.stem}.{self.digest}{path.suffix}"))
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Maps each coding in an Accept-Encoding header to its q-value."""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison, as required for If-None-Match."""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+class StaticAssets:
+    """
+    Serves the static folder and the rendered home page from memory.
+    Files are read, hashed and compressed once at startup; requests only
+    pick a variant, compare ETags and copy bytes.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._by_name: Dict[str, Asset] = {}
+        self._by_fingerprint: Dict[str, Asset] = {}
+        self.page: Optional[Asset] = None
+
+        for path in sorted(self.directory.rglob("*")):
+            if not path.is_file():
+                continue
+            name = path.relative_to(self.directory).as_posix()
+            content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            if content_type.startswith("text/"):
+                content_type += "; charset=utf-8"
+            asset = Asset(name, path.read_bytes(), content_type)
+            self._by_name[name] = asset
+            self._by_fingerprint[asset.fingerprinted_name] = asset
+        logger.info(f"Loaded {len(self._by_name)} static assets into memory.")
+
+    def url(self, name: str) -> str:
+        """Fingerprinted URL for a static file, for use in templates."""
+        asset = self._by_name.get(name)
+        if asset is None:
+            logger.warning(f"Static asset '{name}' not found, serving it unversioned.")
+            return f"/static/{name}"
+        return f"/static/{asset.fingerprinted_name}"
+
+    def set_page(self, html: str):
+        """Stores the pre-rendered home page."""
+        self.page = Asset("index.html", html.encode("utf-8"), "text/html; charset=utf-8")
+
+    def lookup(self, path: str) -> Tuple[Optional[Asset], bool]:
+        """Returns the asset for a /static path and whether the path was fingerprinted."""
+        if path in self._by_fingerprint:
+            return self._by_fingerprint[path], True
+        return self._by_name.get(path), False
+
+    def respond(self, asset: Asset, headers: Mapping[str, str], immutable: bool, head: bool = False) -> Response:
+        """Builds a 200 or 304 response, choosing the best encoding the client accepts."""
+        accepted = parse_accept_encoding(headers.get("accept-encoding", ""))
+        encoding = "identity"
+        for candidate in ("br", "gzip"):
+            if candidate in asset.variants and accepted.get(candidate, 0) > 0:
+                encoding = candidate
+                break
+        variant = asset.variants[encoding]
+
+        response_headers = {
+            "ETag": variant.etag,
+            "Cache-Control": IMMUTABLE_CACHE if immutable else REVALIDATE_CACHE,
+        }
+        if len(asset.variants) > 1:
+            response_headers["Vary"] = "Accept-Encoding"
+        if encoding != "identity":
+            response_headers["Content-Encoding"] = encoding
+
+        if_none_match = headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, variant.etag):
+            return Response(status_code=304, headers=response_headers)
+
+        response_headers["Content-Length"] = str(len(variant.body))
+        return Response(
+            content=b"" if head else variant.body,
+            media_type=asset.content_type,
+            headers=response_headers,
+        )
@@ -111,4 +111,15 @@ def transcribe_audio(audio_file: UploadFile) -> str:
 
     if transcript.status:
         return transcript.text
-    return ""
\ No newline at end of file
+    return ""
+
+
+def transcribe_file(path: str) -> str:
+    """
+    Transcribes a pre-recorded local audio file with AssemblyAI.
+    Raises RuntimeError if the transcription fails.
+    """
+    transcript = aai.Transcriber().transcribe(str(path))
+    if transcript.status == aai.TranscriptStatus.error:
+        raise RuntimeError(f"Transcription failed: {transcript.error}")
+    return (transcript.text or "").strip()
@@ -64,7 +64,15 @@ def convert_text_to_speech(text: str, voice_id: str = "en-US-natalie") -> str:
         "format": "MP3",
         "volume": "100%"
     }
-    response = requests.post(f"{MURF_API_URL}/generate", json=payload, headers=headers)
+    response = requests.post(f"{MURF_API_URL}/generate", json=payload, headers=headers, timeout=config.TTS_TIMEOUT)
     response.raise_for_status()
     response_data = response.json()
-    return response_data.get("audioUrl")
\ No newline at end of file
+    return response_data.get("audioUrl")
+
+
+def download_audio(audio_url: str, output_path: Path) -> Path:
+    """Saves audio generated by convert_text_to_speech; Murf's audioUrl links expire."""
+    response = requests.get(audio_url, timeout=config.TTS_TIMEOUT)
+    response.raise_for_status()
+    output_path.write_bytes(response.content)
+    return output_path
\ No newline at end of file
@@ -56,9 +56,10 @@ document.addEventListener("DOMContentLoaded", () => {
     const playNextInQueue = () => {
         if (audioQueue.length > 0) {
             isPlaying = true;
-            const base64Audio = audioQueue.shift();
-            // Create an Audio element
-            const audio = new Audio("data:audio/wav;base64," + base64Audio);
+            const { b64, format } = audioQueue.shift();
+            // Create an Audio element (fallback clips are MP3, Murf chunks are WAV)
+            const mime = format === "mp3" ? "audio/mpeg" : "audio/wav";
+            const audio = new Audio(`data:${mime};base64,` + b64);
 
             audio.onended = () => {
                 isPlaying = false;
@@ -127,7 +128,7 @@ document.addEventListener("DOMContentLoaded", () => {
                 } else if (msg.type === "assistant") {
                     addOrUpdateMessage(msg.text, "assistant");
                 } else if (msg.type === "audio") {
-                    audioQueue.push(msg.b64);
+                    audioQueue.push({ b64: msg.b64, format: msg.format });
                     if (!isPlaying) {
                         playNextInQueue();
                     }